@@ -1,10 +1,11 @@
 import os
 import re
-import json
 import hashlib
 import smtplib
 from email.mime.text import MIMEText
+from urllib.parse import urlsplit
 
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
 VOLO_URL = "https://www.volosports.com/discover?cityName=New%20York%20Metro%20Area&subView=DAILY&view=SPORTS&sportNames%5B0%5D=Volleyball&programTypes%5B0%5D=PICKUP&programTypes%5B1%5D=DROPIN&venueIds%5B0%5D=d87a520a-8b88-4945-8ca9-e63259de3607&venueIds%5B1%5D=c1c5bae2-654e-4f58-81f6-825d6cbdf5d3&venueIds%5B2%5D=b6443f56-7157-41e1-8804-faded173e515&venueIds%5B3%5D=82dbb9a7-9ef0-4ec5-9e50-5b9c2836c633&timeLow=0&timeHigh=1410"
@@ -14,19 +15,80 @@ RECIPIENTS = ["2402777979@tmomail.net", "auburn.l.robinson@gmail.com"]
 GMAIL_USER = os.environ.get("GMAIL_USER")
 GMAIL_APP_PASSWORD = os.environ.get("GMAIL_APP_PASSWORD")
 
-STATE_FILE = "seen.json"
+STATE_FILE = "seen.log"
 DEBUG = os.environ.get("DEBUG", "0") == "1"
 
+CARDS_TIMEOUT_MS = 15_000
+# Stylesheets stay: inner text depends on layout (display:none, text-transform)
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_HOST_SUFFIXES = (
+    "googletagmanager.com",
+    "google-analytics.com",
+    "doubleclick.net",
+    "segment.com",
+    "segment.io",
+    "fullstory.com",
+    "hotjar.com",
+    "tiktok.com",
+    "linkedin.com",
+    "pinterest.com",
+    "facebook.net",
+    "agkn.com",
+    "liadm.com",
+)
+
 PROGRAM_KEYWORDS = ["pickup", "drop-in", "drop in", "open play", "open gym"]
 SPORT_KEYWORD = "volleyball"
-
-
-def norm(s: str) -> str:
-    return re.sub(r"\s+", " ", s).strip().lower()
+UNAVAILABLE_KEYWORDS = ["sold out", "waitlist"]
+MIN_CARD_CHARS = 30
+MAX_CARD_CHARS = 700
+
+_NL_RE = re.compile(r"\n+")
+
+# Runs the card filter inside the page so we make one CDP round-trip instead of one per <div>
+MATCHING_CARDS_JS = """
+({ sport, program, unavailable, minLen, maxLen }) => {
+  const matched = [];
+  for (const el of document.querySelectorAll("div")) {
+    const txt = (el.innerText || "").trim();
+    // Collapsing whitespace only shrinks the text, so short blocks can be dropped up front
+    if (txt.length < minLen) continue;
+    const t = txt.replace(/\\s+/g, " ").toLowerCase();
+    if (t.length < minLen || t.length > maxLen) continue;
+    if (!t.includes(sport) || !program.some((k) => t.includes(k))) continue;
+    matched.push([el, txt, t]);
+  }
+  const inside = (el) => matched.filter(([other]) => other !== el && el.contains(other)).length;
+  // An ancestor of several matches wraps several cards; drop it
+  const cards = matched.filter(([el]) => inside(el) < 2);
+  // An ancestor of a single match is the full card; drop the inner block (e.g. its title).
+  // Availability is checked on the whole card, since "sold out" is rarely in the title block.
+  return cards
+    .filter(([el]) => !cards.some(([other]) => other !== el && other.contains(el)))
+    .filter(([, , t]) => !unavailable.some((k) => t.includes(k)))
+    .map(([, txt]) => txt);
+}
+"""
+CARD_FILTER_ARGS = {
+    "sport": SPORT_KEYWORD,
+    "program": PROGRAM_KEYWORDS,
+    "unavailable": UNAVAILABLE_KEYWORDS,
+    "minLen": MIN_CARD_CHARS,
+    "maxLen": MAX_CARD_CHARS,
+}
+# Render check for the wait: any session card at all, available or not, stopping at the first
+CARDS_RENDERED_JS = """
+({ sport, program, minLen, maxLen }) => Array.from(document.querySelectorAll("div")).some((el) => {
+  const txt = (el.innerText || "").trim();
+  if (txt.length < minLen) return false;
+  const t = txt.replace(/\\s+/g, " ").toLowerCase();
+  return t.length <= maxLen && t.includes(sport) && program.some((k) => t.includes(k));
+})
+"""
 
 
 def stable_id(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
 
 
 def load_seen() -> set[str]:
@@ -34,14 +96,17 @@ def load_seen() -> set[str]:
         return set()
     try:
         with open(STATE_FILE, "r", encoding="utf-8") as f:
-            return set(json.load(f))
+            return set(f.read().split())
     except Exception:
         return set()
 
 
-def save_seen(seen: set[str]) -> None:
-    with open(STATE_FILE, "w", encoding="utf-8") as f:
-        json.dump(sorted(seen), f, indent=2)
+def append_seen(ids: list[str]) -> None:
+    # One ID per line, append-only: no need to rewrite or sort the whole set each run
+    if not ids:
+        return
+    with open(STATE_FILE, "a", encoding="utf-8") as f:
+        f.write("".join(f"{sid}\n" for sid in ids))
 
 
 def send_email(message: str) -> None:
@@ -63,6 +128,16 @@ def send_email(message: str) -> None:
     print("✅ SMTP accepted message (carrier delivery not guaranteed).", flush=True)
 
 
+def block_assets(route) -> None:
+    req = route.request
+    host = urlsplit(req.url).hostname or ""
+    blocked_host = any(host == d or host.endswith("." + d) for d in BLOCKED_HOST_SUFFIXES)
+    if req.resource_type in BLOCKED_RESOURCE_TYPES or blocked_host:
+        route.abort()
+    else:
+        route.continue_()
+
+
 def click_if_visible(page, *, text=None, selector=None, timeout=3000):
     try:
         loc = page.locator(selector) if selector else page.get_by_text(text, exact=False)
@@ -80,60 +155,54 @@ def main():
     with sync_playwright() as p:
         browser = p.chromium.launch(headless=True)
         page = browser.new_page()
+        page.route("**/*", block_assets)
 
         page.goto(VOLO_URL, wait_until="domcontentloaded", timeout=60_000)
-        page.wait_for_timeout(1500)
+
+        # Wait for what we actually scrape; no card by the timeout just means nothing is listed
+        try:
+            page.wait_for_function(
+                CARDS_RENDERED_JS, arg=CARD_FILTER_ARGS, timeout=CARDS_TIMEOUT_MS, polling=250
+            )
+        except PlaywrightTimeoutError:
+            if DEBUG:
+                print("[DEBUG] no matching card rendered before timeout", flush=True)
 
         # Cookie banner + promo modal
         click_if_visible(page, text="Accept All", timeout=6000)
         click_if_visible(page, selector="button[aria-label='Close']", timeout=2000)
         click_if_visible(page, selector="button:has-text('×')", timeout=2000)
 
-        page.wait_for_timeout(3500)
+        page.wait_for_timeout(500)
 
-        blocks = page.locator("div").all()
+        texts = page.evaluate(MATCHING_CARDS_JS, CARD_FILTER_ARGS)
+        # Hash each summary once; the ID drives both in-run dedup and the seen check
         candidates = []
-
-        for el in blocks:
-            try:
-                txt = (el.inner_text() or "").strip()
-                if not txt:
-                    continue
-                t = norm(txt)
-
-                if SPORT_KEYWORD not in t:
-                    continue
-                if not any(k in t for k in PROGRAM_KEYWORDS):
-                    continue
-                if "sold out" in t or "waitlist" in t:
-                    continue
-                if len(t) < 30 or len(t) > 700:
-                    continue
-
-                summary = re.sub(r"\n+", "\n", txt).strip()
-                candidates.append(summary)
-            except Exception:
+        run_ids = set()
+        for txt in texts:
+            summary = _NL_RE.sub("\n", txt).strip()
+            sid = stable_id(summary)
+            if sid in run_ids:
                 continue
-
-        uniq = list(dict.fromkeys(candidates))
+            run_ids.add(sid)
+            candidates.append((sid, summary))
 
         if DEBUG:
-            print(f"[DEBUG] candidates: {len(uniq)}", flush=True)
-            for s in uniq[:5]:
+            print(f"[DEBUG] candidates: {len(candidates)}", flush=True)
+            for _, s in candidates[:5]:
                 print("[DEBUG]", s.replace("\n", " | ")[:250], flush=True)
 
         # Only alert on NEW ones, but send them all in one message
+        new_ids = []
         new_summaries = []
-        for summary in uniq:
-            sid = stable_id(summary)
+        for sid, summary in candidates:
             if sid in seen:
                 continue
-            seen.add(sid)
+            new_ids.append(sid)
             new_summaries.append(summary)
 
         if not new_summaries:
             print("No new matching sessions.", flush=True)
-            save_seen(seen)
             return
 
         body = "🏐 New Volo Volleyball sessions found:\n\n"
@@ -144,7 +213,7 @@ def main():
         send_email(body)
         print(f"📲 Sent 1 message with {len(new_summaries)} new sessions.", flush=True)
 
-        save_seen(seen)
+        append_seen(new_ids)
 
 
 if __name__ == "__main__":